@@ -8,30 +8,48 @@ Uso:
       --port 2020 \
       --wsdl /percorso/al/wsdl \
       --duration 60 \
-      --topics "tns1:RuleEngine/CellMotionDetector/Motion:IsMotion,tns1:RuleEngine/PeopleDetector/People:IsPeople"
+      --topics "tns1:RuleEngine/CellMotionDetector/Motion:IsMotion,tns1:RuleEngine/PeopleDetector/People:IsPeople" \
+      --notify-host 192.168.1.20 --notify-port 8090
 
 Note:
 - --wsdl è consigliato (punta alla cartella 'onvif/wsdl' del tuo venv o repo)
 - --topics può essere omesso: default = Motion (IsMotion) + People (IsPeople)
+- --notify-host/--notify-port abilitano gli eventi push; se la Subscribe viene
+  rifiutata si torna al PullPoint
 """
 
 import argparse
 import asyncio
 from datetime import datetime, timedelta, UTC
 from pathlib import Path
+import re
 import sys
-from typing import Dict, Iterable, Tuple
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
 
+from aiohttp import web
 from onvif import ONVIFCamera, ONVIFError
-from onvif.managers import PullPointManager
+from onvif.managers import NotificationManager, PullPointManager
 
 
+NOTIFY_PATH = "/onvif/notify"
+
+# Valori SimpleItem considerati "true" (zeep restituisce stringhe o bool)
+TRUE_VALUES = frozenset({"true", "True", "TRUE", "1", True})
+
 DEFAULT_FILTERS = [
     ("tns1:RuleEngine/CellMotionDetector/Motion", ["IsMotion"]),
     ("tns1:RuleEngine/PeopleDetector/People", ["IsPeople"]),
 ]
 
 
+# Separatori precompilati per parse_topics
+_TOPIC_SEP = re.compile(r"\s*,\s*")
+_KEY_SEP = re.compile(r"\s*/\s*")
+# "ns:Percorso/Del/Topic[:Chiave1/Chiave2]" (il primo ":" è il prefisso namespace)
+_TOPIC_RE = re.compile(r"(?P<topic>(?:[\w.-]+:)?[^:]+?)(?::(?P<keys>[^:]*))?")
+
+
 def parse_topics(s: str | None) -> list[Tuple[str, list[str]]]:
     """
     Converte una stringa tipo:
@@ -41,18 +59,19 @@ def parse_topics(s: str | None) -> list[Tuple[str, list[str]]]:
     if not s:
         return DEFAULT_FILTERS.copy()
     out: list[Tuple[str, list[str]]] = []
-    parts = [p.strip() for p in s.split(",") if p.strip()]
-    for p in parts:
-        if ":" not in p:
-            # se manca ":", consideralo come namespace monco, ma non dovrebbe capitare.
+    for p in _TOPIC_SEP.split(s.strip()):
+        if not p:
+            continue
+        if out and ":" not in p and "/" not in p:
+            # supporto anche "topic:IsMotion,IsPeople": chiave extra del topic precedente
+            out[-1][1].append(p)
+            continue
+        m = _TOPIC_RE.fullmatch(p)
+        if not m:
             out.append((p, []))
             continue
-        topic, keys = p.split(":", 1)
-        keylist = [k.strip() for k in keys.split("/") if k.strip()]
-        # supporto anche "topic:IsMotion,IsPeople"
-        if len(keylist) == 1 and "," in keylist[0]:
-            keylist = [x.strip() for x in keylist[0].split(",") if x.strip()]
-        out.append((topic, keylist))
+        keys = m.group("keys") or ""
+        out.append((m.group("topic"), [k for k in _KEY_SEP.split(keys) if k]))
     return out
 
 
@@ -83,6 +102,24 @@ def iter_notifications(msgs) -> Iterable:
         return []
 
 
+def extract_notification(n, _g=getattr, _isd=isinstance, _d=dict):
+    """
+    Estrae (topic, SimpleItem, UtcTime) da una NotificationMessage,
+    sia dict-like sia oggetto zeep.
+    getattr/isinstance legati come default per lookup locali nel loop caldo.
+    """
+    t = n.get("Topic") if _isd(n, _d) else _g(n, "Topic", None)
+    topic = t.get("_value_1") if _isd(t, _d) else _g(t, "_value_1", None)
+    p = n.get("Message") if _isd(n, _d) else _g(n, "Message", None)
+    pv = (p.get("_value_1") if _isd(p, _d) else _g(p, "_value_1", None)) or {}
+    data = (pv.get("Data") if _isd(pv, _d) else _g(pv, "Data", None)) or {}
+    items = (
+        data.get("SimpleItem") if _isd(data, _d) else _g(data, "SimpleItem", None)
+    ) or []
+    ts = pv.get("UtcTime") if _isd(pv, _d) else _g(pv, "UtcTime", None)
+    return topic, items, ts
+
+
 async def close_quietly(obj, meth_name: str):
     """Esegue obj.meth_name() se presente, ignorando gli errori."""
     try:
@@ -97,18 +134,9 @@ async def close_quietly(obj, meth_name: str):
 
 async def drain_camera(cam: ONVIFCamera):
     """Chiude tutto per non lasciare sessioni HTTP aperte."""
-    # Alcuni servizi vanno chiusi singolarmente se li hai creati; qui chiudiamo a scopo precauzionale.
-    for svc_name in (
-        "devicemgmt",
-        "events",
-        "media",
-        "ptz",
-    ):
-        try:
-            svc = await getattr(cam, f"create_{svc_name}_service")()
-            await close_quietly(svc, "close")
-        except Exception:
-            pass
+    # Chiude solo i servizi già creati: crearli qui solo per chiuderli costa un binding WSDL ciascuno
+    for svc in list((getattr(cam, "services", None) or {}).values()):
+        await close_quietly(svc, "close")
 
     # Chiudi eventuale metodo cam.close/async_close
     for n in ("close", "async_close"):
@@ -137,6 +165,8 @@ async def run_listener(
     wsdl_dir: Path,
     duration: int,
     filters: list[Tuple[str, list[str]]],
+    notify_host: str | None = None,
+    notify_port: int = 0,
 ):
     print("============================================================")
     print("🎯 TAPO ONVIF EVENT LISTENER")
@@ -146,16 +176,69 @@ async def run_listener(
         print(f"   • {topic}  Keys={','.join(keys) if keys else '(tutti)'}")
     print("============================================================")
 
+    # topic -> chiavi ammesse (None = tutte), per lookup O(1) per notifica
+    # (stringhe interned: le chiavi (topic, name) di last_state hanno hash già in cache)
+    filter_map: Dict[str, Optional[FrozenSet[str]]] = {
+        sys.intern(t): (frozenset(k) if k else None) for t, k in filters
+    }
+
     cam = ONVIFCamera(ip, port, user, password, str(wsdl_dir))
 
     dev = None
     ppm: PullPointManager | None = None
     pull_svc = None
+    notify_mgr: NotificationManager | None = None
+    notify_runner: web.AppRunner | None = None
 
     # Stati per debounce: (topic, key) -> last_value ("true"/"false")
     last_state: Dict[Tuple[str, str], str] = {}
     hits_true = 0
 
+    def handle_notifications(msgs) -> None:
+        """Applica filtri e debounce a una risposta PullMessages o a un Notify push."""
+        nonlocal hits_true
+        for n in iter_notifications(msgs):
+            topic, simple_items, ts = extract_notification(n)
+            if not topic:
+                continue
+            topic = sys.intern(topic)
+            ts_str = pretty_time(ts)
+
+            # Applica filtro topic
+            if topic not in filter_map:
+                # topic non filtrato -> ignora
+                continue
+            filt_keys = filter_map[topic]
+
+            printed_header = False
+            for it in simple_items:
+                name = it.get("Name") if isinstance(it, dict) else getattr(it, "Name", None)
+                value = it.get("Value") if isinstance(it, dict) else getattr(it, "Value", None)
+                if not name:
+                    continue
+                if filt_keys and name not in filt_keys:
+                    continue
+
+                key = (topic, sys.intern(name))
+                val = "true" if value in TRUE_VALUES else "false"
+                if val != last_state.get(key):
+                    if not printed_header:
+                        print(f"[{ts_str}] {topic}")
+                        printed_header = True
+                    print(f"   • {name} = {value}")
+                    last_state[key] = val
+                    if val == "true":
+                        hits_true += 1
+
+    async def on_notify(request: web.Request) -> web.Response:
+        body = await request.read()
+        if notify_mgr is not None:
+            try:
+                handle_notifications(notify_mgr.process(body))
+            except Exception as e:
+                print(f"[WARN] Notify non valido: {e}")
+        return web.Response(status=200)
+
     try:
         # Risolve XAddrs e stampa qualche info
         await cam.update_xaddrs()
@@ -181,89 +264,62 @@ async def run_listener(
         except Exception:
             pass
 
-        # PullPoint Manager (fa la CreatePullPointSubscription per noi)
-        ppm = await cam.create_pullpoint_manager(
-            timedelta(seconds=60), subscription_lost_callback=None
-        )
-        pull_svc = await cam.create_pullpoint_service()
-        print("✅ PullPointManager: sottoscrizione creata")
-
-        # Richiesta PullMessages
-        req = pull_svc.create_type("PullMessages")
-        req.MessageLimit = 10
-        req.Timeout = timedelta(seconds=2)
-
-        t0 = datetime.now(UTC)
-        while (datetime.now(UTC) - t0).total_seconds() < duration:
+        # Push (WS-BaseNotification): la camera invia Notify al nostro endpoint HTTP
+        if notify_host and notify_port:
+            app = web.Application()
+            app.add_routes([web.post(NOTIFY_PATH, on_notify)])
+            notify_runner = web.AppRunner(app)
+            await notify_runner.setup()
+            await web.TCPSite(notify_runner, port=notify_port).start()
             try:
-                resp = await pull_svc.PullMessages(req)
+                notify_mgr = await cam.create_notification_manager(
+                    f"http://{notify_host}:{notify_port}{NOTIFY_PATH}",
+                    timedelta(seconds=60),
+                    subscription_lost_callback=None,
+                )
+                print("✅ NotificationManager: sottoscrizione push creata")
             except Exception as e:
-                print(f"[WARN] PullMessages errore: {e}; retry...")
-                await asyncio.sleep(0.5)
-                continue
-
-            for n in iter_notifications(resp):
-                # topic
-                topic = None
+                print(f"[WARN] Subscribe rifiutata ({e}); uso PullPoint")
+                notify_mgr = None
+                await close_quietly(notify_runner, "cleanup")
+                notify_runner = None
+
+        if notify_mgr:
+            # Gli eventi arrivano via on_notify; il manager rinnova la sottoscrizione
+            await asyncio.sleep(duration)
+        else:
+            # PullPoint Manager (fa la CreatePullPointSubscription per noi)
+            ppm = await cam.create_pullpoint_manager(
+                timedelta(seconds=60), subscription_lost_callback=None
+            )
+            pull_svc = await cam.create_pullpoint_service()
+            print("✅ PullPointManager: sottoscrizione creata")
+
+            # Richiesta PullMessages
+            req = pull_svc.create_type("PullMessages")
+            req.MessageLimit = 10
+            req.Timeout = timedelta(seconds=2)
+
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
                 try:
-                    topic = (
-                        getattr(n, "Topic", None) or {}
-                    ).get("_value_1") if isinstance(getattr(n, "Topic", None), dict) else getattr(getattr(n, "Topic", None), "_value_1", None)
-                except Exception:
-                    topic = None
-                if not topic:
-                    continue
-
-                # payload data
-                payload = getattr(n, "Message", None)
-                payload_val = getattr(payload, "_value_1", {}) if payload else {}
-                data = payload_val.get("Data", {}) if isinstance(payload_val, dict) else getattr(payload_val, "Data", {})
-                simple_items = []
-                try:
-                    simple_items = data.get("SimpleItem", []) if isinstance(data, dict) else getattr(data, "SimpleItem", []) or []
-                except Exception:
-                    simple_items = []
-
-                # timestamp
-                ts = payload_val.get("UtcTime") if isinstance(payload_val, dict) else getattr(payload_val, "UtcTime", None)
-                ts_str = pretty_time(ts)
-
-                # Applica filtro topic
-                filt_keys = None
-                for ftopic, fkeys in filters:
-                    if ftopic == topic:
-                        filt_keys = fkeys or None
-                        break
-                if filt_keys is None:
-                    # topic non filtrato -> ignora
+                    resp = await pull_svc.PullMessages(req)
+                except Exception as e:
+                    print(f"[WARN] PullMessages errore: {e}; retry...")
+                    await asyncio.sleep(0.5)
                     continue
 
-                printed_header = False
-                for it in simple_items:
-                    name = it.get("Name") if isinstance(it, dict) else getattr(it, "Name", None)
-                    value = it.get("Value") if isinstance(it, dict) else getattr(it, "Value", None)
-                    if not name:
-                        continue
-                    if filt_keys and name not in filt_keys:
-                        continue
-
-                    key = (topic, name)
-                    val = str(value).lower()
-                    if val != last_state.get(key):
-                        if not printed_header:
-                            print(f"[{ts_str}] {topic}")
-                            printed_header = True
-                        print(f"   • {name} = {value}")
-                        last_state[key] = val
-                        if val == "true":
-                            hits_true += 1
-
-            await asyncio.sleep(0.02)  # micro pausa per non saturare
+                # Nessuna pausa: PullMessages blocca già lato camera fino a Timeout
+                handle_notifications(resp)
 
     except ONVIFError as e:
         print(f"❌ Errore ONVIF: {e}")
     finally:
         # Chiusure ordinate per evitare "Unclosed client session"
+        if notify_mgr:
+            await close_quietly(notify_mgr, "stop")
+        if notify_runner:
+            await close_quietly(notify_runner, "cleanup")
         try:
             if pull_svc:
                 await close_quietly(pull_svc, "close")
@@ -299,6 +355,18 @@ async def main_async():
              'Es: "tns1:RuleEngine/CellMotionDetector/Motion:IsMotion,'
              'tns1:RuleEngine/PeopleDetector/People:IsPeople"',
     )
+    ap.add_argument(
+        "--notify-host",
+        type=str,
+        default=None,
+        help="IP di questo host raggiungibile dalla camera, per ricevere eventi push",
+    )
+    ap.add_argument(
+        "--notify-port",
+        type=int,
+        default=0,
+        help="Porta HTTP per eventi push (WS-BaseNotification); 0 = solo PullPoint",
+    )
     args = ap.parse_args()
 
     wsdl_path = Path(args.wsdl)
@@ -323,10 +391,20 @@ async def main_async():
         wsdl_dir=wsdl_path,
         duration=args.duration,
         filters=filters,
+        notify_host=args.notify_host,
+        notify_port=args.notify_port,
     )
 
 
 if __name__ == "__main__":
+    # uvloop (se installato) riduce l'overhead del loop su PullMessages
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     try:
         asyncio.run(main_async())
     except KeyboardInterrupt:
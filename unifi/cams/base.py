@@ -5,7 +5,6 @@ import json
 import logging
 import os
 import shutil
-import ssl
 import subprocess
 import sys
 import tempfile
@@ -21,11 +20,50 @@ import packaging
 import websockets
 from PIL import Image
 
-from unifi.core import RetryableError
+from unifi.core import RetryableError, get_ssl_context
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 AVClientRequest = AVClientResponse = dict[str, Any]
 
 
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def json_dumps_pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def json_dumps_pretty(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+
+# Functions whose full payload is worth logging when received
+LOGGED_FUNCTIONS = frozenset(
+    [
+        "EventSmartDetect",
+        "EventAnalytics",
+        "GetRequest",
+        "ChangeSmartDetectSettings",
+    ]
+)
+
+
+# Snapshot downloads share a per-host connection limit, a hung camera must not hold it
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=10.0, sock_connect=3.0)
+
+
 class SmartDetectObjectType(Enum):
     PERSON = "person"
     VEHICLE = "vehicle"
@@ -92,6 +130,9 @@ def get_unifi_timezone() -> str:
 
 
 class UnifiCamBase(metaclass=ABCMeta):
+    # Cameras that implement get_snapshot_bytes() set this; None from it then means "no snapshot"
+    supports_snapshot_bytes: bool = False
+
     def __init__(self, args: argparse.Namespace, logger: logging.Logger) -> None:
         self.args = args
         self.logger = logger
@@ -117,11 +158,10 @@ class UnifiCamBase(metaclass=ABCMeta):
             self.logger.info("🔕 Eventi disabilitati: gli eventi verranno loggati ma non inviati a UniFi Protect")
 
         # Set up ssl context for requests
-        self._ssl_context = ssl.create_default_context()
-        self._ssl_context.check_hostname = False
-        self._ssl_context.verify_mode = ssl.CERT_NONE
-        self._ssl_context.load_cert_chain(args.cert, args.cert)
+        self._ssl_context = get_ssl_context(args.cert)
         self._session: Optional[websockets.legacy.client.WebSocketClientProtocol] = None
+        # Pooled HTTP session for snapshot fetches/uploads, see _get_http_session
+        self._http_session: Optional[aiohttp.ClientSession] = None
         atexit.register(self.close_streams)
 
         self._needs_flv_timestamps: bool = False
@@ -144,31 +184,50 @@ class UnifiCamBase(metaclass=ABCMeta):
     async def _run(self, ws) -> None:
         self._session = ws
         await self.init_adoption()
-        while True:
-            try:
-                msg = await ws.recv()
-            except websockets.exceptions.ConnectionClosedError as e:
-                self.logger.info(f"Connection to {self.args.host} was closed: {e}")
-                raise RetryableError()
 
-            if msg is not None:
-                # Log received WebSocket messages for debugging (especially Smart Detect related)
+        # Pretty-printing happens in a background task so recv() is not held up
+        log_queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        log_task = asyncio.create_task(self._log_received_frames(log_queue))
+        try:
+            while True:
                 try:
-                    msg_dict = json.loads(msg)
-                    fn = msg_dict.get("functionName", "unknown")
-                    payload = msg_dict.get("payload", {})
-                    
-                    # Log ALL messages at INFO level to understand what UniFi Protect expects
-                    payload_str = json.dumps(payload, indent=2)
-                    self.logger.info(f"🔵 WSS Received: {fn}\n{payload_str}")
-                except Exception as e:
-                    self.logger.debug(f"🔵 WSS Received: (non-JSON message): {e}")
-                
-                force_reconnect = await self.process(msg)
-                if force_reconnect:
-                    self.logger.info("Reconnecting...")
+                    msg = await ws.recv()
+                except websockets.exceptions.ConnectionClosedError as e:
+                    self.logger.info(f"Connection to {self.args.host} was closed: {e}")
                     raise RetryableError()
 
+                if msg is not None:
+                    # Parse once and share the result between logging and dispatch
+                    m = json_loads(msg)
+                    fn = m.get("functionName", "unknown")
+
+                    # Log received WebSocket messages for debugging (especially Smart Detect related)
+                    # Only interesting functions get their payload pretty-printed,
+                    # everything else is already reported by process_message()
+                    if fn in LOGGED_FUNCTIONS:
+                        if log_queue.full():
+                            # Drop the oldest frame rather than blocking the receive side
+                            log_queue.get_nowait()
+                        log_queue.put_nowait((fn, m.get("payload", {})))
+                    else:
+                        self.logger.debug("🔵 WSS Received: %s (filtered)", fn)
+
+                    force_reconnect = await self.process_message(m)
+                    if force_reconnect:
+                        self.logger.info("Reconnecting...")
+                        raise RetryableError()
+        finally:
+            log_task.cancel()
+
+    async def _log_received_frames(self, queue: asyncio.Queue) -> None:
+        while True:
+            fn, payload = await queue.get()
+            try:
+                payload_str = json_dumps_pretty(payload)
+                self.logger.info(f"🔵 WSS Received: {fn}\n{payload_str}")
+            except Exception as e:
+                self.logger.debug(f"🔵 WSS Received: {fn} (unserializable payload): {e}")
+
     async def run(self) -> None:
         return
 
@@ -182,6 +241,10 @@ class UnifiCamBase(metaclass=ABCMeta):
     async def get_snapshot(self) -> Path:
         raise NotImplementedError("You need to write this!")
 
+    async def get_snapshot_bytes(self) -> Optional[bytes]:
+        """JPEG snapshot kept in memory, used when supports_snapshot_bytes is set"""
+        return None
+
     @abstractmethod
     async def get_stream_source(self, stream_index: str) -> str:
         raise NotImplementedError("You need to write this!")
@@ -219,8 +282,15 @@ class UnifiCamBase(metaclass=ABCMeta):
             # This ensures the snapshot is ready when UniFi Protect requests it
             motion_snapshot_path: str = tempfile.NamedTemporaryFile(delete=False).name
             try:
-                snapshot_source = await self.get_snapshot()
-                if snapshot_source and snapshot_source.exists():
+                snapshot_bytes = snapshot_source = None
+                if self.supports_snapshot_bytes:
+                    snapshot_bytes = await self.get_snapshot_bytes()
+                else:
+                    snapshot_source = await self.get_snapshot()
+                if snapshot_bytes:
+                    self._motion_snapshot = Path(motion_snapshot_path)
+                    self._motion_snapshot.write_bytes(snapshot_bytes)
+                elif snapshot_source and snapshot_source.exists():
                     shutil.copyfile(snapshot_source, motion_snapshot_path)
                     self._motion_snapshot = Path(motion_snapshot_path)
                 else:
@@ -457,15 +527,29 @@ class UnifiCamBase(metaclass=ABCMeta):
             self.logger.warning(f"Failed to get image dimensions from {image_path}: {e}")
             return (640, 360)  # Default fallback dimensions
 
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """Shared session, keeps connections to the camera and NVR alive between snapshots"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=4, limit_per_host=2, ttl_dns_cache=300, keepalive_timeout=60
+                )
+            )
+        return self._http_session
+
     async def fetch_to_file(self, url: str, dst: Path) -> bool:
         try:
-            async with aiohttp.request("GET", url) as resp:
+            async with self._get_http_session().get(url, timeout=FETCH_TIMEOUT) as resp:
                 if resp.status != 200:
                     self.logger.error(f"Error retrieving file {resp.status}")
                     return False
                 with dst.open("wb") as f:
-                    f.write(await resp.read())
-                    return True
+                    async for chunk in resp.content.iter_chunked(65536):
+                        f.write(chunk)
+                return True
+        except asyncio.TimeoutError:
+            self.logger.warning("Timed out retrieving file")
+            return False
         except aiohttp.ClientError:
             return False
 
@@ -880,10 +964,10 @@ class UnifiCamBase(metaclass=ABCMeta):
     async def process_smart_detect_settings(self, msg: AVClientRequest) -> AVClientResponse:
         """Process ChangeSmartDetectSettings - required for Smart Detect to work properly"""
         payload = msg.get("payload", {})
-        self.logger.info(f"🔧 ChangeSmartDetectSettings FULL PAYLOAD:\n{json.dumps(payload, indent=2)}")
+        self.logger.info(f"🔧 ChangeSmartDetectSettings FULL PAYLOAD:\n{json_dumps_pretty(payload)}")
         # Log zones configuration to understand what UniFi Protect expects
         if "zones" in payload:
-            self.logger.info(f"🔧 Smart Detect Zones: {json.dumps(payload.get('zones', {}), indent=2)}")
+            self.logger.info(f"🔧 Smart Detect Zones: {json_dumps_pretty(payload.get('zones', {}))}")
         if "zones" in payload and "1" in payload.get("zones", {}):
             zone_obj_types = payload["zones"]["1"].get("objectTypes", [])
             if zone_obj_types:
@@ -1058,24 +1142,33 @@ class UnifiCamBase(metaclass=ABCMeta):
             self.logger.info(f"✅ Using motion snapshot for generic snapshot request (eventId: {event_id})")
             path = self._motion_snapshot
         else:
-            path = await self.get_snapshot()
+            path = None
+            if self.supports_snapshot_bytes:
+                # Upload straight from memory when the camera can produce the JPEG there
+                snapshot_bytes = await self.get_snapshot_bytes()
+                if snapshot_bytes:
+                    await self._upload_snapshot_bytes(msg, snapshot_bytes)
+                    if msg["responseExpected"]:
+                        return self.gen_response("GetRequest", response_to=msg["messageId"])
+                    return None
+            else:
+                path = await self.get_snapshot()
 
         if path and path.exists():
             snapshot_size = path.stat().st_size
             if snapshot_size == 0:
                 self.logger.warning(f"⚠️  Snapshot file {path} exists but is empty (0 bytes)")
-            async with aiohttp.ClientSession() as session:
-                files = {"payload": open(path, "rb")}
-                files.update(msg["payload"].get("formFields", {}))
-                try:
-                    await session.post(
-                        msg["payload"]["uri"],
-                        data=files,
-                        ssl=self._ssl_context,
-                    )
+            files = {"payload": open(path, "rb")}
+            files.update(msg["payload"].get("formFields", {}))
+            try:
+                async with self._get_http_session().post(
+                    msg["payload"]["uri"],
+                    data=files,
+                    ssl=self._ssl_context,
+                ):
                     self.logger.info(f"✅ Uploaded {snapshot_type} from {path} (size: {snapshot_size} bytes)")
-                except aiohttp.ClientError as e:
-                    self.logger.error(f"❌ Failed to upload snapshot {snapshot_type}: {e}")
+            except aiohttp.ClientError as e:
+                self.logger.error(f"❌ Failed to upload snapshot {snapshot_type}: {e}")
         else:
             # If snapshot is not ready, try to generate it on the fly
             if snapshot_type in ["motionSnapshot", "smartDetectZoneSnapshot", "smartDetectSnapshot"]:
@@ -1098,14 +1191,13 @@ class UnifiCamBase(metaclass=ABCMeta):
                                 await asyncio.sleep(0.3)
                     
                     if path and path.exists() and path.stat().st_size > 0:
-                        async with aiohttp.ClientSession() as session:
-                            files = {"payload": open(path, "rb")}
-                            files.update(msg["payload"].get("formFields", {}))
-                            await session.post(
-                                msg["payload"]["uri"],
-                                data=files,
-                                ssl=self._ssl_context,
-                            )
+                        files = {"payload": open(path, "rb")}
+                        files.update(msg["payload"].get("formFields", {}))
+                        async with self._get_http_session().post(
+                            msg["payload"]["uri"],
+                            data=files,
+                            ssl=self._ssl_context,
+                        ):
                             self.logger.info(f"✅ Uploaded on-demand {snapshot_type} from {path} (size: {path.stat().st_size} bytes)")
                     else:
                         self.logger.error(f"❌ Failed to generate valid snapshot for {snapshot_type} after 3 retries")
@@ -1119,6 +1211,22 @@ class UnifiCamBase(metaclass=ABCMeta):
         if msg["responseExpected"]:
             return self.gen_response("GetRequest", response_to=msg["messageId"])
 
+    async def _upload_snapshot_bytes(self, msg: AVClientRequest, data: bytes) -> None:
+        snapshot_type = msg["payload"]["what"]
+        form = aiohttp.FormData()
+        form.add_field("payload", data, filename="screen.jpg", content_type="image/jpeg")
+        for name, value in msg["payload"].get("formFields", {}).items():
+            form.add_field(name, value)
+        try:
+            async with self._get_http_session().post(
+                msg["payload"]["uri"],
+                data=form,
+                ssl=self._ssl_context,
+            ):
+                self.logger.info(f"✅ Uploaded {snapshot_type} from memory (size: {len(data)} bytes)")
+        except aiohttp.ClientError as e:
+            self.logger.error(f"❌ Failed to upload snapshot {snapshot_type}: {e}")
+
     async def process_time(self, msg: AVClientRequest) -> AVClientResponse:
         return self.gen_response(
             "ubnt_avclient_paramAgreement",
@@ -1155,21 +1263,26 @@ class UnifiCamBase(metaclass=ABCMeta):
             fn = msg.get("functionName", "unknown")
             if fn in ["EventSmartDetect", "EventAnalytics"]:
                 # Log Smart Detect events at INFO level with full payload
-                payload_str = json.dumps(msg.get("payload", {}), indent=2)
+                payload_str = json_dumps_pretty(msg.get("payload", {}))
                 self.logger.info(f"🟢 WSS Sending: {fn}\n{payload_str}")
             elif fn in ["GetRequest", "ChangeSmartDetectSettings"]:
                 # Log other important messages at DEBUG level
-                self.logger.debug(f"🟢 WSS Sending: {fn} - {json.dumps(msg, indent=2)[:500]}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        "🟢 WSS Sending: %s - %s", fn, json_dumps_pretty(msg)[:500]
+                    )
             else:
-                self.logger.debug(f"🟢 WSS Sending: {fn}")
-            await ws.send(json.dumps(msg).encode())
+                self.logger.debug("🟢 WSS Sending: %s", fn)
+            await ws.send(json_dumps(msg))
 
     async def process(self, msg: bytes) -> bool:
-        m = json.loads(msg)
+        return await self.process_message(json_loads(msg))
+
+    async def process_message(self, m: AVClientRequest) -> bool:
         fn = m["functionName"]
 
-        self.logger.info(f"Processing [{fn}] message")
-        self.logger.debug(f"Message contents: {m}")
+        self.logger.info("Processing [%s] message", fn)
+        self.logger.debug("Message contents: %s", m)
 
         if (("responseExpected" not in m) or (m["responseExpected"] is False)) and (
             fn
@@ -1296,6 +1409,9 @@ class UnifiCamBase(metaclass=ABCMeta):
         self.logger.info("Cleaning up instance")
         await self.trigger_motion_stop()
         self.close_streams()
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
 
     def close_streams(self):
         for stream in self._ffmpeg_handles:
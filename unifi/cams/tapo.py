@@ -1,59 +1,174 @@
 import argparse
 import asyncio
+import functools
+import json
 import logging
-import subprocess
+import operator
+import os
+import sys
 import tempfile
 import time
 from datetime import datetime, timedelta, UTC
 from pathlib import Path
-from typing import Any, Optional, Dict, Tuple
+from typing import Any, Optional, Dict, Set, Tuple
 
 import aiohttp
-import httpx
-from onvif import ONVIFCamera, ONVIFError
-from onvif.managers import PullPointManager
+from aiohttp import web
 
 from unifi.cams.base import SmartDetectObjectType, UnifiCamBase
 
+# Frames from the persistent snapshot stream older than this are not served
+SNAPSHOT_MAX_AGE = 5.0
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+HTTP_SNAPSHOT_TIMEOUT = aiohttp.ClientTimeout(total=3.0)
+
+WEBHOOK_PATH = "/onvif/notify"
+# Go back to PullMessages polling if no webhook arrived for this long
+WEBHOOK_IDLE_FALLBACK = 60.0
+
+# Motion detection filters: topic -> accepted SimpleItem names (empty = all)
+_MOTION_FILTERS: Dict[str, frozenset] = {
+    "tns1:RuleEngine/CellMotionDetector/Motion": frozenset({"IsMotion"}),
+    "tns1:RuleEngine/PeopleDetector/People": frozenset({"IsPeople"}),
+}
+
+# Camera imaging values (0-255) <-> UniFi percentages (0-100)
+_TO_PCT = tuple(int(i * 100 / 255) for i in range(256))
+_FROM_PCT = tuple(int(i * 255 / 100) for i in range(101))
+
+
+def _to_pct(value) -> int:
+    value = min(max(value, 0), 255)
+    if isinstance(value, int):
+        return _TO_PCT[value]
+    # Float from the camera: scale before truncating, like the table does
+    return int(value * 100 / 255)
+
+
+def _from_pct(value) -> int:
+    value = min(max(value, 0), 100)
+    if isinstance(value, int):
+        return _FROM_PCT[value]
+    return int(value * 255 / 100)
+
+
+# SimpleItem values as they come from zeep (bool) or raw XML (str/bytes)
+_TRUTHY = frozenset({True, "true", "True", "1", b"true", b"1"})
+_FALSY = frozenset({False, "false", "False", "0", b"false", b"0"})
+
+
+_get_value_1 = operator.attrgetter("_value_1")
+_get_message_data = operator.attrgetter("Message._value_1.Data")
+
+
+def _extract_zeep(n) -> Tuple[Any, list]:
+    """Topic and SimpleItems of a zeep NotificationMessage"""
+    return _get_value_1(n.Topic), getattr(_get_message_data(n), "SimpleItem", None) or []
+
+
+def _extract_dict(n) -> Tuple[Any, list]:
+    """Topic and SimpleItems of a NotificationMessage whose parts are dicts"""
+    data = (n.Message._value_1 or {}).get("Data") or {}
+    return n.Topic.get("_value_1"), data.get("SimpleItem") or []
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_wsdl_dir() -> Optional[str]:
+    """Find WSDL directory - works both in development and Docker"""
+    possible_paths = [
+        "/app/wsdl",  # Docker container path
+        os.path.abspath("wsdl"),  # Local development absolute path
+        "venv/lib/python3.13/site-packages/onvif/wsdl",  # Relative venv
+    ]
+    for path in possible_paths:
+        if os.path.isdir(path):
+            return path
+    # Let onvif-zeep-async use default
+    return None
+
 
 class TapoCam(UnifiCamBase):
+    supports_snapshot_bytes = True
+
     def __init__(self, args: argparse.Namespace, logger: logging.Logger) -> None:
         super().__init__(args, logger)
         self.snapshot_dir = tempfile.mkdtemp()
         self.motion_in_progress: bool = False
         self._last_event_timestamp: float = 0
+        # Set on every accepted motion event, see _motion_expiry_loop
+        self._motion_event = asyncio.Event()
+        # _handle_motion_start calls still sending their start to Protect
+        self._starts_in_flight: int = 0
         self._smart_detect_active: bool = False  # Track if Smart Detect event is active
         self._last_smart_detect_time: float = 0  # Track when last Smart Detect event was sent
         self._pending_generic_motion: bool = False  # Track if we have a pending generic motion event
         self._pending_motion_timestamp: float = 0  # Timestamp of pending motion event
         
         # Motion detection state tracking
-        self.last_motion_state: Dict[Tuple[str, str], str] = {}
+        # Keyed by an interned "topic|name" string, see _key_cache
+        self.last_motion_state: Dict[str, bool] = {}
+        self._key_cache: Dict[str, Dict[str, str]] = {}
+        # Minimum time between accepted state flips for the same (topic, name)
+        self._min_flip_interval: float = 0.25
+        self._last_flip_ts: Dict[str, float] = {}
+        # Rising edges held back by the flip interval, see _defer_motion_start
+        self._deferred_rises: Dict[str, asyncio.TimerHandle] = {}
+        self._deferred_tasks: Set[asyncio.Future] = set()
         
+        # Smart Detect types advertised in get_feature_flags, which is called on every (re)connect
+        self._smart_detect_types: Tuple[str, ...] = ("person",)
+
         # Stream resolution cache - will be populated by _analyze_stream
         self._stream_resolutions: Dict[str, Tuple[int, int]] = {}
+        self._stream_analyzed: Set[str] = set()
+
+        # go2rtc stream names are derived from the camera IP and never change
+        self._ip_normalized = self.args.ip.replace(".", "_")
+        self._stream_name_sd = f"tapo_{self._ip_normalized}_sd"
+        self._rtsp_url_sd = f"rtsp://127.0.0.1:8554/{self._stream_name_sd}"
+
+        # Latest JPEG from the persistent snapshot stream, see _snapshot_worker
+        self._latest_jpeg: Optional[bytes] = None
+        self._latest_jpeg_ts: float = 0
+
+        # Notification parser (_extract_zeep or _extract_dict), chosen on the first notification.
+        # Notification types are stable for a given camera firmware, so the
+        # dict/zeep checks don't need to be repeated for every message.
+        self._extract = None
+
+        # Credentials for the HTTP snapshot fallbacks
+        self._http_auth = aiohttp.BasicAuth(self.args.username, self.args.password)
+        # Last HTTP snapshot URL that worked, tried first next time
+        self._working_snapshot_url: Optional[str] = None
+
+        # ONVIF webhook (WS-BaseNotification) consumer, see _setup_webhook
+        self.notification_manager = None
+        self._webhook_runner: Optional[web.AppRunner] = None
+        if bool(self.args.webhook_host) != bool(self.args.webhook_port):
+            self.logger.warning("Both --webhook-host and --webhook-port are needed for the ONVIF webhook, using PullMessages")
+        self._last_webhook_ts: float = 0
+        # Set by _on_sub_lost when the PullPoint subscription can't be renewed
+        self._pullpoint_lost: bool = False
         
+        # Errors from a PullMessages call that mean the subscription needs to be recreated,
+        # completed with the ONVIF/zeep ones below
+        self._pull_errors: Tuple[type, ...] = (aiohttp.ClientError, asyncio.TimeoutError)
+
         # Initialize ONVIF camera connection
         try:
-            # Find WSDL directory - works both in development and Docker
-            import os
-            wsdl_dir = None
-            possible_paths = [
-                "/app/wsdl",  # Docker container path
-                os.path.abspath("wsdl"),  # Local development absolute path
-                "venv/lib/python3.13/site-packages/onvif/wsdl",  # Relative venv
-                None  # Let onvif-zeep-async use default
-            ]
-            
-            for path in possible_paths:
-                if path is None:
-                    wsdl_dir = None
-                    break
-                if os.path.exists(path):
-                    wsdl_dir = path
-                    self.logger.info(f"Using WSDL directory: {wsdl_dir}")
-                    break
-            
+            # onvif/zeep load their whole XML schema stack: import them only when a Tapo camera is used
+            from onvif import ONVIFCamera, ONVIFError
+            from zeep.exceptions import Fault
+
+            self._pull_errors += (ONVIFError, Fault)
+
+            # WSDL directory is resolved once per process, see _resolve_wsdl_dir
+            wsdl_dir = _resolve_wsdl_dir()
+            if wsdl_dir:
+                self.logger.debug(f"Using WSDL directory: {wsdl_dir}")
+
             self.cam = ONVIFCamera(
                 self.args.ip, 
                 2020,  # Tapo cameras use port 2020 for ONVIF
@@ -66,8 +181,15 @@ class TapoCam(UnifiCamBase):
             self.media = None
             self.events = None
             self.profiles = []
+            self.imaging = None
+            self._video_source_token = None
+            self._imaging_settings = None
             self.pullpoint_manager = None
             self.pullpoint_service = None
+            # PullMessages request, built once by _initialize_onvif and reused across reconnects
+            self._pull_req = None
+            # Short PullMessages request used by _discard_queued_pulls
+            self._drain_req = None
             
         except Exception as e:
             self.logger.warning(f"ONVIF initialization failed: {e}")
@@ -76,8 +198,13 @@ class TapoCam(UnifiCamBase):
             self.media = None
             self.events = None
             self.profiles = []
+            self.imaging = None
+            self._video_source_token = None
+            self._imaging_settings = None
             self.pullpoint_manager = None
             self.pullpoint_service = None
+            self._pull_req = None
+            self._drain_req = None
     
     async def _initialize_onvif(self):
         """Initialize ONVIF services asynchronously"""
@@ -94,29 +221,69 @@ class TapoCam(UnifiCamBase):
             # Get stream profiles asynchronously
             self.profiles = await self.media.GetProfiles()
             self.logger.info(f"Found {len(self.profiles)} stream profiles")
+
+            # Imaging service for get/change_video_settings, bound once per connection
+            try:
+                self.imaging = await self.cam.create_imaging_service()
+                self._video_source_token = self.profiles[0].VideoSourceConfiguration.SourceToken
+                # Refreshed on every (re)connect, then kept up to date by change_video_settings
+                self._imaging_settings = None
+            except Exception as e:
+                self.logger.debug(f"Imaging service not available: {e}")
+                self.imaging = None
+                self._video_source_token = None
+                self._imaging_settings = None
             
             # Initialize PullPoint manager for motion detection
             try:
+                # Don't leave the previous subscription renewing in the background
+                await self._shutdown_pullpoint_manager()
+                # Long termination time: PullMessages keeps the subscription alive, so the
+                # manager only has to renew every few minutes instead of every minute
+                self._pullpoint_lost = False
                 self.pullpoint_manager = await self.cam.create_pullpoint_manager(
-                    timedelta(seconds=60), subscription_lost_callback=None
+                    timedelta(minutes=10), subscription_lost_callback=self._on_sub_lost
                 )
                 self.pullpoint_service = await self.cam.create_pullpoint_service()
+                if self._pull_req is None:
+                    # The request only depends on the WSDL types, so every new service can reuse it
+                    self._pull_req = self.pullpoint_service.create_type("PullMessages")
+                    # PullMessages blocks server-side until an event or Timeout,
+                    # so no extra pause is needed between pulls
+                    self._pull_req.MessageLimit = 100
+                    self._pull_req.Timeout = timedelta(seconds=30)
                 self.logger.info("✅ PullPointManager initialized for motion detection")
             except Exception as e:
                 self.logger.warning(f"PullPointManager initialization failed: {e}")
-                self.pullpoint_manager = None
+                await self._shutdown_pullpoint_manager()
                 self.pullpoint_service = None
             
         except Exception as e:
+            # Keep self.cam: the camera may just be unreachable for now, _pull_events retries
             self.logger.warning(f"ONVIF async initialization failed: {e}")
-            self.logger.info("Will use fallback motion detection method")
-            self.cam = None
             self.media = None
             self.events = None
             self.profiles = []
-            self.pullpoint_manager = None
+            self.imaging = None
+            self._video_source_token = None
+            self._imaging_settings = None
+            await self._shutdown_pullpoint_manager()
             self.pullpoint_service = None
 
+    async def _shutdown_pullpoint_manager(self) -> None:
+        """Stop the PullPoint manager for good
+
+        stop() alone leaves an in-flight renew/restart task able to re-arm renewals,
+        which would keep calling _on_sub_lost on a subscription nobody uses anymore.
+        """
+        if self.pullpoint_manager is None:
+            return
+        manager, self.pullpoint_manager = self.pullpoint_manager, None
+        try:
+            await manager.shutdown()
+        except Exception as e:
+            self.logger.debug(f"Could not stop previous PullPointManager: {e}")
+
     @classmethod
     def add_parser(cls, parser: argparse.ArgumentParser) -> None:
         super().add_parser(parser)
@@ -141,6 +308,17 @@ class TapoCam(UnifiCamBase):
             default=None,
             help="Custom snapshot URL (optional, will use ONVIF if not provided)",
         )
+        parser.add_argument(
+            "--webhook-host",
+            default=None,
+            help="Address of this host as seen by the camera, to receive ONVIF events via webhook",
+        )
+        parser.add_argument(
+            "--webhook-port",
+            default=0,
+            type=int,
+            help="Port for the ONVIF event webhook (default: disabled, poll with PullMessages)",
+        )
         parser.add_argument(
             "--single-stream",
             choices=["stream1", "stream2"],
@@ -150,16 +328,8 @@ class TapoCam(UnifiCamBase):
 
     async def get_feature_flags(self) -> dict[str, Any]:
         """Return feature flags indicating Smart Detect support"""
-        base_flags = await super().get_feature_flags()
-        flags = {
-            **base_flags,
-            **{
-                "smartDetect": [
-                    "person",
-                ],
-            },
-        }
-        self.logger.info(f"Returning feature flags: {flags}")
+        flags = await super().get_feature_flags()
+        flags["smartDetect"] = self._smart_detect_types
         return flags
 
     async def get_snapshot(self) -> Path:
@@ -169,93 +339,137 @@ class TapoCam(UnifiCamBase):
             # Use custom snapshot URL if provided
             await self.fetch_to_file(self.args.snapshot_url, img_file)
         else:
-            # Usa go2rtc per ottenere snapshot dallo stream RTSP (più affidabile)
-            # Prendi lo stream SD da go2rtc che è più veloce
-            # Costruisce il nome dello stream basandosi sull'IP della telecamera
-            ip_normalized = self.args.ip.replace(".", "_")
-            stream_name = f"tapo_{ip_normalized}_sd"
-            rtsp_url = f"rtsp://127.0.0.1:8554/{stream_name}"
-            
-            snapshot_success = False
+            # Frame JPEG in memoria (stream persistente o ffmpeg one-shot da go2rtc)
+            snapshot_bytes = await self._grab_go2rtc_jpeg()
+            if snapshot_bytes:
+                img_file.write_bytes(snapshot_bytes)
+            else:
+                await self._fetch_fallback_snapshot(img_file)
+        return img_file
+
+    async def get_snapshot_bytes(self) -> Optional[bytes]:
+        """Snapshot JPEG, kept in memory whenever go2rtc can provide it"""
+        img_file = Path(self.snapshot_dir, "screen.jpg")
+        if self.args.snapshot_url:
+            if await self.fetch_to_file(self.args.snapshot_url, img_file):
+                return img_file.read_bytes()
+            return None
+
+        snapshot_bytes = await self._grab_go2rtc_jpeg()
+        if snapshot_bytes:
+            return snapshot_bytes
+
+        # Solo i fallback HTTP/ONVIF passano dal file su disco
+        if await self._fetch_fallback_snapshot(img_file):
+            return img_file.read_bytes()
+        return None
+
+    async def _fetch_fallback_snapshot(self, img_file: Path) -> bool:
+        """Fetch a snapshot from the camera itself when go2rtc isn't working"""
+        # Fallback: prova HTTP snapshot direttamente dalla telecamera (più veloce quando go2rtc non funziona)
+        snapshot_success = False
+        self.logger.info(f"🔄 Trying HTTP snapshot fallback for {self.args.ip}...")
+        http_urls = [
+            f"http://{self.args.ip}/streaming/snapshot.jpg",
+            f"http://{self.args.ip}/snapshot.jpg",
+        ]
+        if self._working_snapshot_url:
+            # Go straight to the URL that worked last time, the full list only if it stops working
+            http_urls.remove(self._working_snapshot_url)
+            http_urls.insert(0, self._working_snapshot_url)
+            self._working_snapshot_url = None
+
+        for url in http_urls:
             try:
-                # Usa FFmpeg per estrarre un frame dallo stream RTSP
-                cmd = (
-                    f'ffmpeg -nostdin -y -rtsp_transport tcp -i "{rtsp_url}" '
-                    f'-frames:v 1 -f image2 -update 1 "{img_file}"'
-                )
-                result = await asyncio.create_subprocess_shell(
-                    cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=5.0)  # Reduced timeout for faster fallback
-                
-                if result.returncode == 0 and img_file.exists() and img_file.stat().st_size > 0:
-                    self.logger.debug(f"✅ Snapshot captured from go2rtc stream: {img_file}")
-                    snapshot_success = True
-                else:
-                    stderr_str = stderr.decode()[:200] if stderr else ""
-                    self.logger.warning(f"⚠️  FFmpeg snapshot from go2rtc failed: {stderr_str}")
-            except asyncio.TimeoutError:
-                self.logger.warning("⚠️  Snapshot capture from go2rtc timed out, trying fallback...")
+                if await self._fetch_http_snapshot(url, img_file):
+                    if img_file.exists() and img_file.stat().st_size > 0:
+                        self.logger.info(f"✅ Snapshot captured via HTTP from {self.args.ip}")
+                        self._working_snapshot_url = url
+                        snapshot_success = True
+                        break
             except Exception as e:
-                self.logger.warning(f"⚠️  Failed to get snapshot from go2rtc: {e}, trying fallback...")
-            
-            # Fallback: prova HTTP snapshot direttamente dalla telecamera (più veloce quando go2rtc non funziona)
-            if not snapshot_success:
-                self.logger.info(f"🔄 Trying HTTP snapshot fallback for {self.args.ip}...")
-            http_urls = [
-                f"http://{self.args.username}:{self.args.password}@{self.args.ip}/streaming/snapshot.jpg",
-                f"http://{self.args.username}:{self.args.password}@{self.args.ip}/snapshot.jpg",
-            ]
-            
-            for url in http_urls:
-                try:
-                    if await self.fetch_to_file(url, img_file):
-                        if img_file.exists() and img_file.stat().st_size > 0:
-                            self.logger.info(f"✅ Snapshot captured via HTTP from {self.args.ip}")
-                            snapshot_success = True
-                            break
-                except Exception as e:
-                    self.logger.debug(f"HTTP snapshot URL {url} failed: {e}")
-            
-            # Fallback finale: ONVIF snapshot
-            if not snapshot_success and self.media and len(self.profiles) > 0:
-                try:
-                    self.logger.info(f"🔄 Trying ONVIF snapshot fallback for {self.args.ip}...")
-                    profile = self.profiles[0]
-                    snapshot_uri = await self.media.GetSnapshotUri({
-                        'ProfileToken': profile.token
-                    })
-                    snapshot_uri = snapshot_uri.Uri
-                    if await self.fetch_to_file(snapshot_uri, img_file):
-                        if img_file.exists() and img_file.stat().st_size > 0:
-                            self.logger.info(f"✅ Snapshot captured via ONVIF from {self.args.ip}")
-                            snapshot_success = True
-                except Exception as e:
-                    self.logger.warning(f"⚠️  Failed to get ONVIF snapshot: {e}")
-            
-            if not snapshot_success:
-                self.logger.error(f"❌ All snapshot methods failed for {self.args.ip}")
+                self.logger.debug(f"HTTP snapshot URL {url} failed: {e}")
         
-        return img_file
+        # Fallback finale: ONVIF snapshot
+        if not snapshot_success and self.media and len(self.profiles) > 0:
+            try:
+                self.logger.info(f"🔄 Trying ONVIF snapshot fallback for {self.args.ip}...")
+                profile = self.profiles[0]
+                snapshot_uri = await self.media.GetSnapshotUri({
+                    'ProfileToken': profile.token
+                })
+                snapshot_uri = snapshot_uri.Uri
+                if await self.fetch_to_file(snapshot_uri, img_file):
+                    if img_file.exists() and img_file.stat().st_size > 0:
+                        self.logger.info(f"✅ Snapshot captured via ONVIF from {self.args.ip}")
+                        snapshot_success = True
+            except Exception as e:
+                self.logger.warning(f"⚠️  Failed to get ONVIF snapshot: {e}")
+        
+        if not snapshot_success:
+            self.logger.error(f"❌ All snapshot methods failed for {self.args.ip}")
+
+        return snapshot_success
+
+    async def _grab_go2rtc_jpeg(self) -> Optional[bytes]:
+        """JPEG from go2rtc without touching disk, None if it isn't available"""
+        # Frame recente dallo stream snapshot persistente: nessun processo da avviare
+        if self._latest_jpeg and time.monotonic() - self._latest_jpeg_ts < SNAPSHOT_MAX_AGE:
+            return self._latest_jpeg
+
+        # Usa go2rtc per ottenere snapshot dallo stream RTSP (più affidabile)
+        # Prendi lo stream SD da go2rtc che è più veloce
+        try:
+            # Usa FFmpeg per estrarre un frame dallo stream RTSP, letto da stdout
+            result = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-nostdin",
+                "-rtsp_transport", "tcp",
+                # Decode keyframes only and skip the audio stream
+                "-skip_frame", "nokey", "-an",
+                "-i", self._rtsp_url_sd,
+                "-frames:v", "1", "-c:v", "mjpeg", "-f", "image2pipe", "pipe:1",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=5.0)  # Reduced timeout for faster fallback
+            except asyncio.TimeoutError:
+                result.kill()
+                raise
+
+            if result.returncode == 0 and stdout:
+                self.logger.debug(f"✅ Snapshot captured from go2rtc stream ({len(stdout)} bytes)")
+                return stdout
+            stderr_str = stderr[:200].decode(errors="ignore") if stderr else ""
+            self.logger.warning(f"⚠️  FFmpeg snapshot from go2rtc failed: {stderr_str}")
+        except asyncio.TimeoutError:
+            self.logger.warning("⚠️  Snapshot capture from go2rtc timed out, trying fallback...")
+        except Exception as e:
+            self.logger.warning(f"⚠️  Failed to get snapshot from go2rtc: {e}, trying fallback...")
+        return None
+
+    async def _fetch_http_snapshot(self, url: str, dst: Path) -> bool:
+        # Shared pooled session from UnifiCamBase, keeps the connection to the camera alive
+        async with self._get_http_session().get(
+            url, auth=self._http_auth, timeout=HTTP_SNAPSHOT_TIMEOUT
+        ) as resp:
+            if resp.status != 200:
+                self.logger.debug(f"HTTP snapshot URL {url} returned {resp.status}")
+                return False
+            with dst.open("wb") as f:
+                async for chunk in resp.content.iter_chunked(65536):
+                    f.write(chunk)
+        return True
 
     async def get_stream_source(self, stream_index: str) -> str:
         """Get RTSP stream URL for the specified stream index"""
         # Usa go2rtc per il transcoding invece della camera direttamente
         # go2rtc espone solo lo stream SD (stream2) per evitare connessioni multiple
         # Tutti gli stream (video1, video2, video3) usano lo stesso stream SD
-        ip_normalized = self.args.ip.replace(".", "_")
-        
-        # Tutti gli stream usano lo stesso stream SD
-        stream_name = f"tapo_{ip_normalized}_sd"
-        
-        stream_url = f"rtsp://127.0.0.1:8554/{stream_name}"
+        stream_url = self._rtsp_url_sd
         self.logger.info(f"Using go2rtc stream SD for {stream_index} (IP: {self.args.ip}): {stream_url}")
-        
+
         # Analyze stream properties on first access
-        if not hasattr(self, '_stream_analyzed'):
-            self._stream_analyzed = set()
         if stream_index not in self._stream_analyzed:
             await self._analyze_stream(stream_url, stream_index)
             self._stream_analyzed.add(stream_index)
@@ -263,81 +477,140 @@ class TapoCam(UnifiCamBase):
         return stream_url
     
     async def _analyze_stream(self, stream_url: str, stream_index: str) -> None:
-        """Analyze stream properties using ffmpeg and extract resolution"""
+        """Analyze stream properties using ffprobe and extract resolution"""
         try:
-            # Use ffmpeg to get stream information
-            cmd = [
-                "ffmpeg", "-rtsp_transport", "tcp",
+            # ffprobe only reads the stream headers, nothing is decoded
+            proc = await asyncio.create_subprocess_exec(
+                "ffprobe", "-v", "error",
+                "-rtsp_transport", "tcp",
+                "-select_streams", "v:0",
+                "-show_entries", "stream=width,height,codec_name,avg_frame_rate,bit_rate",
+                "-of", "json",
                 "-i", stream_url,
-                "-t", "1", "-f", "null", "-"
-            ]
-            result = subprocess.run(
-                cmd,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                timeout=10
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
             )
-            
-            output = result.stderr.decode('utf-8', errors='ignore')
-            
-            # Extract resolution from output (format: "1920x1080" or "Stream #0:0: Video: h264, 1920x1080")
-            width, height = None, None
-            import re
-            # Try to find resolution in format WIDTHxHEIGHT
-            resolution_match = re.search(r'(\d{3,5})x(\d{3,5})', output)
-            if resolution_match:
-                width = int(resolution_match.group(1))
-                height = int(resolution_match.group(2))
-                self._stream_resolutions[stream_index] = (width, height)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=5.0)
+            except asyncio.TimeoutError:
+                proc.kill()
+                raise
+
+            streams = json.loads(stdout or b"{}").get("streams") or []
+            if not streams:
+                stderr_str = stderr[:200].decode(errors="ignore") if stderr else ""
+                self.logger.warning(f"Could not extract stream info for {stream_index}: {stderr_str}")
+                return
+
+            info = streams[0]
+            width, height = info.get("width"), info.get("height")
+            if width and height:
+                self._stream_resolutions[stream_index] = (int(width), int(height))
                 self.logger.info(f"Stream {stream_index} resolution detected: {width}x{height}")
-            
-            # Extract key information for logging
-            info_lines = []
-            for line in output.split('\n'):
-                if any(keyword in line.lower() for keyword in [
-                    'stream', 'video', 'audio', 'resolution', 'fps', 
-                    'bitrate', 'codec', 'pixel', 'yuv', 'sar', 'dar'
-                ]):
-                    info_lines.append(line.strip())
-            
-            if info_lines:
-                self.logger.info(f"Stream {stream_index} analysis:")
-                for line in info_lines[:15]:  # Limit to first 15 lines
-                    self.logger.info(f"  {line}")
-            else:
-                self.logger.warning(f"Could not extract stream info for {stream_index}")
-                
-        except subprocess.TimeoutExpired:
+
+            self.logger.info(
+                f"Stream {stream_index} analysis: codec={info.get('codec_name')} "
+                f"fps={info.get('avg_frame_rate')} bitrate={info.get('bit_rate')}"
+            )
+
+        except asyncio.TimeoutError:
             self.logger.warning(f"Stream analysis timeout for {stream_index}")
         except Exception as e:
             self.logger.warning(f"Could not analyze stream {stream_index}: {e}")
 
-    async def maybe_end_motion_event(self, timestamp: float) -> None:
-        """End motion event if no new events have occurred"""
-        await asyncio.sleep(2)  # Wait 2 seconds
-        
-        if timestamp == self._last_event_timestamp:
-            if self.motion_in_progress:
-                self.motion_in_progress = False
-                # Don't reset _smart_detect_active immediately - keep it active for a bit longer
-                # to prevent generic motion events from overriding Smart Detect events
-                # The flag will be reset when a new motion event starts (if not Smart Detect)
-                self.logger.info("Motion event ended")
-                await self.trigger_motion_stop()
+    async def _snapshot_worker(self) -> None:
+        """Keep one ffmpeg turning the go2rtc SD stream into JPEGs for get_snapshot"""
+        while True:
+            proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-nostdin", "-loglevel", "error",
+                "-rtsp_transport", "tcp",
+                "-an", "-i", self._rtsp_url_sd,
+                "-r", "2", "-c:v", "mjpeg", "-f", "image2pipe", "pipe:1",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            buf = bytearray()
+            try:
+                while True:
+                    chunk = await proc.stdout.read(65536)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    # Keep the newest complete frame and drop everything before it
+                    end = buf.rfind(JPEG_EOI)
+                    if end == -1:
+                        if len(buf) > 8 * 1024 * 1024:
+                            buf.clear()
+                        continue
+                    start = buf.rfind(JPEG_SOI, 0, end)
+                    if start != -1:
+                        self._latest_jpeg = bytes(buf[start:end + 2])
+                        self._latest_jpeg_ts = time.monotonic()
+                    del buf[:end + 2]
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+
+            self.logger.warning("Snapshot stream from go2rtc ended, restarting in 5 seconds")
+            await asyncio.sleep(5)
+
+    async def _motion_expiry_loop(self) -> None:
+        """End the motion event once no new events arrived for 2 seconds"""
+        while True:
+            await self._motion_event.wait()
+            self._motion_event.clear()
+            try:
+                # Any new event within 2 seconds restarts the countdown
+                await asyncio.wait_for(self._motion_event.wait(), 2.0)
+            except asyncio.TimeoutError:
+                if self._starts_in_flight:
+                    # Don't stop before the start went out, it sets the event again when done
+                    continue
+                await self._end_motion_now()
+
+    async def _end_motion_now(self) -> None:
+        if not self.motion_in_progress:
+            return
+        self.motion_in_progress = False
+        # Don't reset _smart_detect_active immediately - keep it active for a bit longer
+        # to prevent generic motion events from overriding Smart Detect events
+        # The flag will be reset when a new motion event starts (if not Smart Detect)
+        self.logger.info("Motion event ended")
+        await self.trigger_motion_stop()
 
     async def run(self) -> None:
         """Main event loop for handling motion events using PullPointManager with auto-reconnect"""
         self.logger.info("Starting motion detection for Tapo camera using PullPointManager")
-        
-        # Motion detection filters - based on your working script
-        motion_filters = [
-            ("tns1:RuleEngine/CellMotionDetector/Motion", ["IsMotion"]),
-            ("tns1:RuleEngine/PeopleDetector/People", ["IsPeople"]),
-        ]
-        
+        self.logger.info(f"Advertising Smart Detect types: {', '.join(self._smart_detect_types)}")
+
+        # A single task ends motion events, instead of one per accepted event
+        tasks = [asyncio.create_task(self._motion_expiry_loop())]
+        if not self.args.snapshot_url:
+            tasks.append(asyncio.create_task(self._snapshot_worker()))
+        try:
+            await self._pull_events()
+        finally:
+            for task in tasks:
+                task.cancel()
+            for deferred in self._deferred_rises.values():
+                deferred.cancel()
+            self._deferred_rises.clear()
+
+    async def _pull_events(self) -> None:
+        """PullPoint loop with auto-reconnect"""
         retry_delay = 5  # Start with 5 seconds delay
         max_retry_delay = 60  # Max 60 seconds delay
-        
+        # Shorter backoff after a failed PullMessages on a working connection
+        pull_error_delay = 0.5
+        max_pull_error_delay = 5
+
+        if self.cam is None:
+            # ONVIFCamera could not be created: there are no events to pull, so wait
+            # here until cancelled instead of retrying (snapshots keep working)
+            self.logger.warning("ONVIF not available, motion detection disabled for this camera")
+            await asyncio.Event().wait()
+
         while True:
             try:
                 # Initialize/reinitialize ONVIF services
@@ -355,29 +628,42 @@ class TapoCam(UnifiCamBase):
                 
                 self.logger.info("✅ PullPoint service connected, starting motion detection")
                 self.logger.info("Starting PullPoint motion detection with filters:")
-                for topic, keys in motion_filters:
-                    self.logger.info(f"  • {topic}  Keys={','.join(keys)}")
+                for topic, keys in _MOTION_FILTERS.items():
+                    self.logger.info(f"  • {topic}  Keys={','.join(sorted(keys))}")
                 
-                # Create PullMessages request
-                req = self.pullpoint_service.create_type("PullMessages")
-                req.MessageLimit = 10
-                req.Timeout = timedelta(seconds=2)
+                # Only the request object is reused: zeep must still render each envelope,
+                # because the WS-Security UsernameToken needs a fresh Nonce/Created per call
+                req = self._pull_req
                 
+                # Prefer camera-pushed events when a webhook is configured
+                await self._setup_webhook()
+
                 # Main loop for pulling messages
-                while True:
+                paused_for_webhook = False
+                while not self._pullpoint_lost:
+                    webhook_idle = time.monotonic() - self._last_webhook_ts
+                    if self.notification_manager and webhook_idle < WEBHOOK_IDLE_FALLBACK:
+                        # Events are arriving via webhook, skip polling until it goes quiet
+                        paused_for_webhook = True
+                        await asyncio.sleep(WEBHOOK_IDLE_FALLBACK - webhook_idle)
+                        continue
+
                     try:
+                        if paused_for_webhook:
+                            paused_for_webhook = False
+                            await self._discard_queued_pulls()
                         # Pull messages from the subscription
                         resp = await self.pullpoint_service.PullMessages(req)
-                        
-                        # Process notifications
-                        await self._process_pullpoint_notifications(resp, motion_filters)
-                        
-                        await asyncio.sleep(0.02)  # micro pausa per non saturare
-                        
-                    except Exception as e:
-                        self.logger.warning(f"PullMessages error: {e}; reconnecting...")
+                    except self._pull_errors as e:
+                        self.logger.warning(f"PullMessages error: {e}; reconnecting in {pull_error_delay} seconds...")
+                        await asyncio.sleep(pull_error_delay)
+                        pull_error_delay = min(pull_error_delay * 2, max_pull_error_delay)
                         # Break inner loop to reconnect
                         break
+                    pull_error_delay = 0.5
+
+                    # Process notifications
+                    await self._process_pullpoint_notifications(resp, _MOTION_FILTERS)
                         
             except Exception as e:
                 self.logger.warning(f"ONVIF connection error: {e}; retrying in {retry_delay} seconds...")
@@ -385,6 +671,76 @@ class TapoCam(UnifiCamBase):
                 retry_delay = min(retry_delay * 2, max_retry_delay)  # Exponential backoff
                 continue
     
+    async def _discard_queued_pulls(self) -> None:
+        """Drop what the PullPoint queued while the webhook delivered the same events
+
+        Replaying those true/false pairs would fire a fake motion event for each
+        one; SetSynchronizationPoint then reports the current state instead.
+        """
+        if self._drain_req is None:
+            self._drain_req = self.pullpoint_service.create_type("PullMessages")
+            self._drain_req.MessageLimit = 100
+            self._drain_req.Timeout = timedelta(seconds=1)
+        for _ in range(10):
+            resp = await self.pullpoint_service.PullMessages(self._drain_req)
+            if not self._iter_notifications(resp):
+                break
+        await self.pullpoint_manager.set_synchronization_point()
+
+    async def _setup_webhook(self) -> None:
+        """Subscribe the camera to push Notify messages to a local endpoint"""
+        if not self.args.webhook_port or not self.args.webhook_host:
+            return
+        if self.notification_manager is not None:
+            return
+
+        async def on_notify(request: web.Request) -> web.Response:
+            body = await request.read()
+            if self.notification_manager is not None:
+                try:
+                    resp = self.notification_manager.process(body)
+                    self._last_webhook_ts = time.monotonic()
+                    await self._process_pullpoint_notifications(resp, _MOTION_FILTERS)
+                except Exception as e:
+                    self.logger.debug(f"Invalid webhook notification: {e}")
+            return web.Response(text="ok")
+
+        if self._webhook_runner is None:
+            app = web.Application()
+            app.add_routes([web.post(WEBHOOK_PATH, on_notify)])
+            runner = web.AppRunner(app)
+            await runner.setup()
+            try:
+                await web.TCPSite(runner, port=self.args.webhook_port).start()
+            except OSError as e:
+                # Don't subscribe the camera to an endpoint nobody listens on, retried next pass
+                self.logger.warning(f"Cannot listen on webhook port {self.args.webhook_port}, using PullMessages: {e}")
+                await runner.cleanup()
+                return
+            self._webhook_runner = runner
+
+        address = f"http://{self.args.webhook_host}:{self.args.webhook_port}{WEBHOOK_PATH}"
+        try:
+            self.notification_manager = await self.cam.create_notification_manager(
+                address,
+                timedelta(seconds=60),
+                subscription_lost_callback=self._on_webhook_lost,
+            )
+            self.logger.info(f"✅ ONVIF webhook subscribed at {address}")
+        except Exception as e:
+            self.logger.warning(f"ONVIF webhook subscription rejected, using PullMessages: {e}")
+            self.notification_manager = None
+
+    def _on_sub_lost(self) -> None:
+        # Called by PullPointManager: _pull_events leaves its inner loop and re-runs _initialize_onvif
+        self.logger.warning("PullPoint subscription lost, reconnecting...")
+        self._pullpoint_lost = True
+
+    def _on_webhook_lost(self) -> None:
+        # The manager restarts the subscription by itself: keep it, just poll until Notify resumes
+        self.logger.warning("ONVIF webhook subscription lost, falling back to PullMessages")
+        self._last_webhook_ts = 0
+
     def _iter_notifications(self, msgs) -> list:
         """Normalize PullMessages response"""
         if msgs is None:
@@ -399,39 +755,28 @@ class TapoCam(UnifiCamBase):
         except Exception:
             return []
 
-    async def _process_pullpoint_notifications(self, resp, filters):
+    async def _process_pullpoint_notifications(self, resp, filters: Dict[str, frozenset]):
         """Process PullPoint notifications - simplified logic"""
         for n in self._iter_notifications(resp):
-            # Extract topic
-            topic = None
+            extract = self._extract
+            if extract is None:
+                extract = _extract_dict if isinstance(getattr(n, "Topic", None), dict) else _extract_zeep
             try:
-                topic = (
-                    getattr(n, "Topic", None) or {}
-                ).get("_value_1") if isinstance(getattr(n, "Topic", None), dict) else getattr(getattr(n, "Topic", None), "_value_1", None)
-            except Exception:
-                topic = None
-            if not topic:
+                topic, simple_items = extract(n)
+            except (AttributeError, KeyError, TypeError):
                 continue
-
-            # Extract payload data
-            payload = getattr(n, "Message", None)
-            payload_val = getattr(payload, "_value_1", {}) if payload else {}
-            data = payload_val.get("Data", {}) if isinstance(payload_val, dict) else getattr(payload_val, "Data", {})
-            simple_items = []
-            try:
-                simple_items = data.get("SimpleItem", []) if isinstance(data, dict) else getattr(data, "SimpleItem", []) or []
-            except Exception:
-                simple_items = []
+            self._extract = extract
 
             # Apply topic filter
-            filt_keys = None
-            for ftopic, fkeys in filters:
-                if ftopic == topic:
-                    filt_keys = fkeys or None
-                    break
+            filt_keys = filters.get(topic)
             if filt_keys is None:
                 continue
 
+            # Interned "topic|name" keys of this topic, looked up by name without building a tuple
+            topic_keys = self._key_cache.get(topic)
+            if topic_keys is None:
+                topic_keys = self._key_cache[topic] = {}
+
             # Process motion events
             for it in simple_items:
                 name = it.get("Name") if isinstance(it, dict) else getattr(it, "Name", None)
@@ -441,62 +786,105 @@ class TapoCam(UnifiCamBase):
                 if filt_keys and name not in filt_keys:
                     continue
 
-                key = (topic, name)
-                val = str(value).lower()
+                key = topic_keys.get(name)
+                if key is None:
+                    key = topic_keys[name] = sys.intern(f"{topic}|{name}")
+                try:
+                    if value in _TRUTHY:
+                        state = True
+                    elif value in _FALSY:
+                        state = False
+                    else:
+                        continue
+                except TypeError:
+                    continue
                 
+                if not state:
+                    # A falling edge supersedes a rising edge still waiting in _defer_motion_start
+                    deferred = self._deferred_rises.pop(key, None)
+                    if deferred is not None:
+                        deferred.cancel()
+
                 # Check for state change
-                if val != self.last_motion_state.get(key):
-                    self.last_motion_state[key] = val
-                    
-                    if val == "true":
-                        self._last_event_timestamp = time.time()
-                        
-                        if name == "IsPeople":
-                            # Person detected - upgrade existing motion event to Smart Detect
-                            if self.motion_in_progress and self._motion_object_type is None:
-                                # Generic motion is active, upgrade it to Person Smart Detect
-                                self._smart_detect_active = True
-                                self._last_smart_detect_time = time.time()
-                                await self.trigger_motion_start(SmartDetectObjectType.PERSON)
-                            elif not self.motion_in_progress:
-                                # No motion active, send Person Smart Detect directly
-                                self.motion_in_progress = True
-                                self._smart_detect_active = True
-                                self._last_smart_detect_time = time.time()
-                                await self.trigger_motion_start(SmartDetectObjectType.PERSON)
-                            # If Person event already active, ignore duplicate
-                            
-                        elif name == "IsMotion":
-                            # Generic motion detected - send motion event immediately
-                            # BUT: Don't send generic motion if Smart Detect is already active
-                            # This prevents overwriting Smart Detect events with generic motion
-                            if not self.motion_in_progress:
-                                self.motion_in_progress = True
-                                await self.trigger_motion_start()
-                            elif self._motion_object_type is not None:
-                                # Smart Detect is active, don't downgrade to generic motion
-                                self.logger.debug(f"Ignoring IsMotion event - Smart Detect ({self._motion_object_type.value}) already active")
-                            # If motion already active, ignore duplicate
-                        else:
-                            # Other motion types - send immediately
-                            if not self.motion_in_progress:
-                                self.motion_in_progress = True
-                            await self.trigger_motion_start()
-                        
-                        # Schedule motion end check
-                        asyncio.ensure_future(
-                            self.maybe_end_motion_event(self._last_event_timestamp)
-                        )
-                    
-                    elif val == "false" and self.motion_in_progress:
-                        # Motion ended - handled by maybe_end_motion_event
-                        pass
+                if state is not self.last_motion_state.get(key):
+                    # Delay true flips right after a previous change (false->true storms).
+                    # Falling edges are always recorded so the state can't get stuck on True
+                    now = time.monotonic()
+                    since_flip = now - self._last_flip_ts.get(key, 0)
+                    if state and since_flip < self._min_flip_interval:
+                        self._defer_motion_start(key, name, self._min_flip_interval - since_flip)
+                        continue
+                    self._last_flip_ts[key] = now
+                    self.last_motion_state[key] = state
 
+                    if state:
+                        await self._handle_motion_start(name)
 
-    
+    def _defer_motion_start(self, key: str, name: str, delay: float) -> None:
+        """Apply a rate-limited rising edge once the flip interval has passed
 
-    
+        The camera doesn't resend "true" while motion continues, so a dropped
+        edge would never be reported.
+        """
+        if key in self._deferred_rises:
+            return
+        self._deferred_rises[key] = asyncio.get_running_loop().call_later(
+            delay, self._apply_deferred_rise, key, name
+        )
+
+    def _apply_deferred_rise(self, key: str, name: str) -> None:
+        self._deferred_rises.pop(key, None)
+        if self.last_motion_state.get(key):
+            return
+        self._last_flip_ts[key] = time.monotonic()
+        self.last_motion_state[key] = True
+        task = asyncio.ensure_future(self._handle_motion_start(name))
+        self._deferred_tasks.add(task)
+        task.add_done_callback(self._deferred_tasks.discard)
 
+    async def _handle_motion_start(self, name: str) -> None:
+        """Act on an accepted rising edge of a motion SimpleItem"""
+        self._last_event_timestamp = time.time()
+        self._starts_in_flight += 1
+        try:
+            if name == "IsPeople":
+                # Person detected - upgrade existing motion event to Smart Detect
+                if self.motion_in_progress and self._motion_object_type is None:
+                    # Generic motion is active, upgrade it to Person Smart Detect
+                    self._smart_detect_active = True
+                    self._last_smart_detect_time = time.time()
+                    await self.trigger_motion_start(SmartDetectObjectType.PERSON)
+                elif not self.motion_in_progress:
+                    # No motion active, send Person Smart Detect directly
+                    self.motion_in_progress = True
+                    self._smart_detect_active = True
+                    self._last_smart_detect_time = time.time()
+                    await self.trigger_motion_start(SmartDetectObjectType.PERSON)
+                # If Person event already active, ignore duplicate
+
+            elif name == "IsMotion":
+                # Generic motion detected - send motion event immediately
+                # BUT: Don't send generic motion if Smart Detect is already active
+                # This prevents overwriting Smart Detect events with generic motion
+                if not self.motion_in_progress:
+                    self.motion_in_progress = True
+                    await self.trigger_motion_start()
+                elif self._motion_object_type is not None:
+                    # Smart Detect is active, don't downgrade to generic motion
+                    self.logger.debug(
+                        "Ignoring IsMotion event - Smart Detect (%s) already active",
+                        self._motion_object_type.value,
+                    )
+                # If motion already active, ignore duplicate
+            else:
+                # Other motion types - send immediately
+                if not self.motion_in_progress:
+                    self.motion_in_progress = True
+                await self.trigger_motion_start()
+        finally:
+            self._starts_in_flight -= 1
+            # The 2 s countdown starts once the (possibly slow) start has been sent
+            self._motion_event.set()
 
     def get_extra_ffmpeg_args(self, stream_index: str) -> str:
         """Get extra FFmpeg arguments for stream processing"""
@@ -508,21 +896,26 @@ class TapoCam(UnifiCamBase):
             "-c:a aac -ar 32000 -ac 1 -b:a 32k"
         )
 
+    async def _get_imaging_settings(self):
+        """Imaging settings of the first video source, fetched once per connection"""
+        if self._imaging_settings is None:
+            self._imaging_settings = await self.imaging.GetImagingSettings({
+                'VideoSourceToken': self._video_source_token
+            })
+        return self._imaging_settings
+
     async def get_video_settings(self) -> dict[str, Any]:
         """Get current video settings from camera"""
         try:
-            # Get imaging settings from first profile
-            profile = self.profiles[0]
-            imaging = self.cam.create_imaging_service()
-            imaging_settings = imaging.GetImagingSettings({
-                'VideoSourceToken': profile.VideoSourceConfiguration.SourceToken
-            })
+            if self.imaging is None:
+                return {}
+            imaging_settings = await self._get_imaging_settings()
             
             return {
-                "brightness": int(imaging_settings.Brightness * 100 / 255),
-                "contrast": int(imaging_settings.Contrast * 100 / 255),
-                "saturation": int(imaging_settings.ColorSaturation * 100 / 255),
-                "sharpness": int(imaging_settings.Sharpness * 100 / 255),
+                "brightness": _to_pct(imaging_settings.Brightness),
+                "contrast": _to_pct(imaging_settings.Contrast),
+                "saturation": _to_pct(imaging_settings.ColorSaturation),
+                "sharpness": _to_pct(imaging_settings.Sharpness),
             }
         except Exception as e:
             self.logger.warning(f"Could not get video settings: {e}")
@@ -531,42 +924,49 @@ class TapoCam(UnifiCamBase):
     async def change_video_settings(self, options: dict[str, Any]) -> None:
         """Change video settings on camera"""
         try:
-            profile = self.profiles[0]
-            imaging = self.cam.create_imaging_service()
-            
-            # Get current settings
-            current_settings = imaging.GetImagingSettings({
-                'VideoSourceToken': profile.VideoSourceConfiguration.SourceToken
-            })
+            if self.imaging is None:
+                self.logger.warning("Could not change video settings: imaging service not available")
+                return
+
+            # Cached settings: only SetImagingSettings goes to the camera
+            current_settings = await self._get_imaging_settings()
             
             # Update settings based on options
             if 'brightness' in options:
-                current_settings.Brightness = int(options['brightness'] * 255 / 100)
+                current_settings.Brightness = _from_pct(options['brightness'])
             if 'contrast' in options:
-                current_settings.Contrast = int(options['contrast'] * 255 / 100)
+                current_settings.Contrast = _from_pct(options['contrast'])
             if 'saturation' in options:
-                current_settings.ColorSaturation = int(options['saturation'] * 255 / 100)
+                current_settings.ColorSaturation = _from_pct(options['saturation'])
             if 'sharpness' in options:
-                current_settings.Sharpness = int(options['sharpness'] * 255 / 100)
+                current_settings.Sharpness = _from_pct(options['sharpness'])
             
             # Apply settings
-            imaging.SetImagingSettings({
-                'VideoSourceToken': profile.VideoSourceConfiguration.SourceToken,
+            await self.imaging.SetImagingSettings({
+                'VideoSourceToken': self._video_source_token,
                 'ImagingSettings': current_settings
             })
             
             self.logger.info(f"Updated video settings: {options}")
             
         except Exception as e:
+            # The cached copy may now differ from the camera, fetch it again next time
+            self._imaging_settings = None
             self.logger.warning(f"Could not change video settings: {e}")
 
     async def _cleanup_onvif(self):
         """Clean up ONVIF connections"""
         try:
+            if self.notification_manager:
+                # shutdown() also stops a restart the manager may have in flight
+                await self.notification_manager.shutdown()
+                self.notification_manager = None
+            if self._webhook_runner:
+                await self._webhook_runner.cleanup()
+                self._webhook_runner = None
             if self.pullpoint_service:
                 await self.pullpoint_service.close()
-            if self.pullpoint_manager:
-                await self.pullpoint_manager.stop()
+            await self._shutdown_pullpoint_manager()
             if self.cam:
                 # Close camera connection
                 if hasattr(self.cam, 'close'):
@@ -576,6 +976,11 @@ class TapoCam(UnifiCamBase):
         except Exception as e:
             self.logger.debug(f"Error during ONVIF cleanup: {e}")
 
+    async def close(self) -> None:
+        # Core only calls close(), never __aexit__
+        await super().close()
+        await self._cleanup_onvif()
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Cleanup when exiting context"""
         await self._cleanup_onvif()
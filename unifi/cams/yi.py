@@ -1,10 +1,13 @@
 import argparse
 import asyncio
+import json
 import logging
-import re
+import os
+import signal
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import Dict, Set, Tuple
 
 from aiohttp import web
 
@@ -26,10 +29,14 @@ class YiCam(UnifiCamBase):
         self.snapshot_dir = tempfile.mkdtemp()
         self.snapshot_stream = None
         self.runner = None
+        self._stream_resolutions: Dict[str, Tuple[int, int]] = {}
+        self._stream_analyzed: Set[str] = set()
         
         # Usa go2rtc per il transcoding invece della camera direttamente
         # go2rtc espone solo lo stream SD (ch0_0.h264) per evitare connessioni multiple
         # Tutti gli stream (video1, video2, video3) usano lo stesso stream SD
+        ip_normalized = self.args.ip.replace(".", "_")
+        self._rtsp_url_sd = f"rtsp://127.0.0.1:8554/yi_{ip_normalized}_sd"
         
         if not self.args.snapshot_url:
             self.start_snapshot_stream()
@@ -90,20 +97,31 @@ class YiCam(UnifiCamBase):
         if not self.snapshot_stream or self.snapshot_stream.poll() is not None:
             # Usa go2rtc per ottenere snapshot dallo stream RTSP (più affidabile)
             # Prendi lo stream SD da go2rtc che è più veloce
-            ip_normalized = self.args.ip.replace(".", "_")
-            rtsp_url = f"rtsp://127.0.0.1:8554/yi_{ip_normalized}_sd"
+            rtsp_url = self._rtsp_url_sd
             
-            cmd = (
-                f"ffmpeg -nostdin -y -re -rtsp_transport tcp "
-                f'-i "{rtsp_url}" '
-                "-r 1 "
-                f"-update 1 {self.snapshot_dir}/screen.jpg"
-            )
-            self.logger.info(f"Avvio stream per snapshot da go2rtc: {cmd}")
+            cmd = [
+                "ffmpeg", "-nostdin", "-y", "-re",
+                "-rtsp_transport", "tcp",
+                "-i", rtsp_url,
+                "-r", "1",
+                "-update", "1", f"{self.snapshot_dir}/screen.jpg",
+            ]
+            self.logger.info(f"Avvio stream per snapshot da go2rtc: {' '.join(cmd)}")
+            # Niente shell: ffmpeg è il leader del proprio gruppo, così close() lo termina davvero
             self.snapshot_stream = subprocess.Popen(
-                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, shell=True
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
             )
 
+    def stop_snapshot_stream(self) -> None:
+        if self.snapshot_stream and self.snapshot_stream.poll() is None:
+            try:
+                os.killpg(self.snapshot_stream.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
     async def get_snapshot(self) -> Path:
         """Ottiene uno snapshot dalla camera"""
         img_file = Path(self.snapshot_dir, "screen.jpg")
@@ -148,25 +166,17 @@ class YiCam(UnifiCamBase):
         if self.runner:
             await self.runner.cleanup()
 
-        if self.snapshot_stream:
-            self.snapshot_stream.kill()
+        self.stop_snapshot_stream()
 
     async def get_stream_source(self, stream_index: str) -> str:
         """Get RTSP stream URL for the specified stream index"""
         # Usa go2rtc per il transcoding invece della camera direttamente
         # go2rtc espone solo lo stream SD (ch0_0.h264) per evitare connessioni multiple
         # Tutti gli stream (video1, video2, video3) usano lo stesso stream SD
-        ip_normalized = self.args.ip.replace(".", "_")
-        
-        # Tutti gli stream usano lo stesso stream SD
-        stream_name = f"yi_{ip_normalized}_sd"
-        
-        stream_url = f"rtsp://127.0.0.1:8554/{stream_name}"
+        stream_url = self._rtsp_url_sd
         self.logger.info(f"Using go2rtc stream SD for {stream_index} (IP: {self.args.ip}): {stream_url}")
         
         # Analyze stream properties on first access
-        if not hasattr(self, '_stream_analyzed'):
-            self._stream_analyzed = set()
         if stream_index not in self._stream_analyzed:
             await self._analyze_stream(stream_url, stream_index)
             self._stream_analyzed.add(stream_index)
@@ -174,30 +184,32 @@ class YiCam(UnifiCamBase):
         return stream_url
     
     async def _analyze_stream(self, stream_url: str, stream_index: str) -> None:
-        """Analyze stream properties using ffmpeg and extract resolution"""
+        """Analyze stream properties using ffprobe and extract resolution"""
         try:
-            # Use ffmpeg to get stream information
+            # ffprobe only reads the stream headers, nothing is decoded
             cmd = [
-                "ffmpeg", "-rtsp_transport", "tcp",
-                "-i", stream_url,
-                "-t", "1", "-f", "null", "-"
+                "ffprobe", "-v", "quiet",
+                "-rtsp_transport", "tcp",
+                "-print_format", "json",
+                "-show_streams", "-select_streams", "v:0",
+                stream_url,
             ]
             result = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
             )
-            stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=5.0)
-            
-            # Parse resolution from stderr
-            stderr_str = stderr.decode()
-            import re
-            resolution_match = re.search(r'(\d+)x(\d+)', stderr_str)
-            if resolution_match:
-                width = int(resolution_match.group(1))
-                height = int(resolution_match.group(2))
+            try:
+                stdout, _ = await asyncio.wait_for(result.communicate(), timeout=5.0)
+            except asyncio.TimeoutError:
+                result.kill()
+                raise
+
+            streams = json.loads(stdout or b"{}").get("streams") or []
+            if streams and streams[0].get("width") and streams[0].get("height"):
+                width = int(streams[0]["width"])
+                height = int(streams[0]["height"])
                 self._stream_resolutions[stream_index] = (width, height)
                 self.logger.info(f"Stream {stream_index} resolution: {width}x{height}")
         except Exception as e:
             self.logger.warning(f"Failed to analyze stream {stream_index}: {e}")
-
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import ssl
 
 import backoff
@@ -9,6 +10,16 @@ class RetryableError(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=4)
+def get_ssl_context(cert: str) -> ssl.SSLContext:
+    # Loading the cert chain parses PEM on every call, so build once per cert
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    ssl_context.load_cert_chain(cert, cert)
+    return ssl_context
+
+
 class Core(object):
     def __init__(self, args, camera, logger):
         self.host = args.host
@@ -18,10 +29,7 @@ class Core(object):
         self.cam = camera
 
         # Set up ssl context for requests
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-        self.ssl_context.load_cert_chain(args.cert, args.cert)
+        self.ssl_context = get_ssl_context(args.cert)
 
     async def run(self) -> None:
         uri = "wss://{}:7442/camera/1.0/ws?token={}".format(self.host, self.token)
@@ -45,6 +53,10 @@ class Core(object):
                     additional_headers=headers,
                     ssl=self.ssl_context,
                     subprotocols=["secure_transfer"],
+                    # Control messages are small JSON; skip permessage-deflate
+                    # and the per-frame size check
+                    compression=None,
+                    max_size=None,
                 )
                 has_connected = True
             except websockets.exceptions.InvalidStatusCode as e:
@@ -20,6 +20,11 @@ from unifi.cams import (
 from unifi.core import Core
 from unifi.version import __version__
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 CAMS = {
     "amcrest": DahuaCam,
     "dahua": DahuaCam,
@@ -172,6 +177,8 @@ async def run():
 
 
 def main():
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     loop = asyncio.get_event_loop()
     loop.run_until_complete(run())
 